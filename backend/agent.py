@@ -4,65 +4,121 @@ This agent interacts with the stock advisory API to provide personalized recomme
 """
 
 import asyncio
+import hashlib
 import json
+import re
+import sys
+import textwrap
+import time
 from huggingface_hub import InferenceClient
-import requests
-from typing import Dict, Any, Optional
-from dataclasses import dataclass
+import aiohttp
+from typing import Dict, Any, Callable, Final, List, NamedTuple, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import partial
 from smolagents import InferenceClientModel, ToolCallingAgent, Tool, LLM
 from smolagents.tools import HttpTool
 from smolagents import FinalAnswerTool
 from smolagents import LiteLLMModel, CodeAgent
 from dotenv import load_dotenv
+from prompt_toolkit import PromptSession
+from async_lru import alru_cache
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
+    
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
+# uvloop is not available on Windows; asyncio's default loop is used there
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
-@dataclass
-class UserProfile:
-    """User profile for stock recommendations, including the main parameters to be passed into the prediction agent"""
-    risk_tolerance: str  # 'conservative', 'balanced', 'aggressive'
-    investment_amount: float
-    investment_goals: str
-    time_horizon: str  # 'short-term', 'medium-term', 'long-term'
+# aiohttp can only decode brotli bodies when a brotli binding is installed, so only advertise it then
+try:
+    import brotli  # noqa: F401
+    _ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    _ACCEPT_ENCODING = "gzip, deflate"
 
+_SESSION_HEADERS = {
+    "Content-Type": "application/json",
+    "Accept-Encoding": _ACCEPT_ENCODING,
+    "Connection": "keep-alive"
+}
+# Attempts per request, and the exponential backoff between them (base and cap, in seconds)
+_RETRY_ATTEMPTS = 3
+_RETRY_BACKOFF = 0.2
+_RETRY_BACKOFF_MAX = 2.0
+# A down API should fail fast; each call site picks its own read timeout on top of this
+_CONNECT_TIMEOUT = 2.0
+# Idempotent GET responses (health, custom stock list) are reused for this long, up to this many entries
+_GET_CACHE_TTL = 30.0
+_GET_CACHE_MAX = 128
+# Separators users type between tickers: commas, semicolons and any whitespace, in any mix
+_SYMBOL_SEP_RE = re.compile(r"[\s,;]+")
+# Uncompressed recommendation bodies smaller than this are buffered and parsed in one go instead of streamed
+_STREAM_MIN_BYTES = 32 * 1024
+# How long a fetched cluster analysis is served from cache before hitting the API again.
+# Inits run by other clients (e.g. the web frontend) are invisible to _init_gen, so entries still expire.
+_CLUSTER_CACHE_TTL = 300.0
 
-class StockAdvisorAgent:
-    """Class built on top of smolagents api"""
-    
-    def __init__(self, api_base_url: str = "http://localhost:5000"):
-        self.api_base_url = api_base_url
-        model=LiteLLMModel(model_id="gpt-4o-mini")
-   
-        
-        # Initialize the stock advisory API tools with the smolagents api
-        self.tools = [
-            FinalAnswerTool(),
-            self.create_init_tool(),
-            self.create_clusters_tool(),
-            self.create_recommend_tool(),
-            self.create_health_check_tool(),
-            self.create_add_custom_stocks_tool(),
-            self.create_remove_custom_stocks_tool(),
-            self.create_list_custom_stocks_tool(),
-            self.create_clear_custom_stocks_tool()
-        ] 
-        
-        # Create the agent with tools
-        self.agent = ToolCallingAgent(
-            name="StockAdvisor",
-            description="An AI agent that provides personalized stock recommendations based on user risk tolerance and investment goals",
-            tools=self.tools,
-            llm=self.llm, 
-            system_prompt=self.get_system_prompt() #wrote object oriented so I can organize all code into one spot
-        )
-        
-        # Track if API is initialized
-        self.api_initialized = False
-    
-    def get_system_prompt(self) -> str:
-        """Get the system prompt for the agent"""
-        return """
+# Fixed output shapes for the cluster tools
+_CLUSTER_SUMMARY_TMPL = "Cluster {id}: {size} stocks, Risk Level: {risk_level}, Avg Return: {avg_return:.2%}, Avg Volatility: {avg_volatility:.2%}"
+
+_CLUSTER_DETAIL_TMPL = """
+Cluster {cluster_id} ({risk_level} Risk):
+- Number of stocks: {size}
+- Average annual return: {avg_return:.2%}
+- Average volatility: {avg_volatility:.2%}
+- Average Sharpe ratio: {avg_sharpe:.2f}
+- Sample stocks: {sample_stocks}
+"""
+
+# Fixed output shapes for get_recommendations, filled with str.format_map
+_BACKTEST_TMPL = """
+Historical Performance (Backtest):
+- Total Return: {total_return:.2%}
+- Annual Return: {annual_return:.2%}
+- Volatility: {volatility:.2%}
+- Sharpe Ratio: {sharpe_ratio:.2f}
+- Maximum Drawdown: {max_drawdown:.2%}
+"""
+
+_RECOMMEND_TMPL = """Stock Recommendations for {risk_title} Risk Profile:
+
+Portfolio Summary:
+- Total Investment: ${total_investment:,.2f}
+- Expected Annual Return: {expected_return:.2%}
+- Portfolio Volatility: {volatility:.2%}
+- Sharpe Ratio: {sharpe_ratio:.2f}
+
+Recommended Allocations:
+{allocation_text}
+{backtest_summary}
+
+Investment Goals Considered: {investment_goals}
+
+Note: These are algorithmic recommendations. Please consult with a financial advisor before making investment decisions. Past performance does not guarantee future results."""
+
+
+# Built once at import; trimming indentation and trailing whitespace shrinks the prompt sent on every turn
+# It is the same object for every agent and turn, so the provider's automatic prompt-prefix caching can reuse it
+_SYSTEM_PROMPT: Final[str] = "\n".join(line.rstrip() for line in textwrap.dedent("""
 You are a professional financial advisor AI agent specializing in stock portfolio recommendations. 
 
 Your capabilities:
@@ -96,297 +152,382 @@ Custom Stock Management:
 - Always confirm successful addition of custom stocks
 
 Always ask for user's risk tolerance and investment amount before making recommendations.
-"""
+""").strip().splitlines())
+
+_PORTFOLIO_FIELDS = frozenset(('total_investment', 'expected_return', 'volatility', 'sharpe_ratio'))
+_ALLOCATION_FIELDS = frozenset(('weight', 'dollar_amount', 'shares'))
+_BACKTEST_FIELDS = frozenset(('total_return', 'annual_return', 'volatility', 'sharpe_ratio', 'max_drawdown'))
+
+
+async def _stream_recommendation(content: aiohttp.StreamReader) -> Dict[str, Any]:
+    """Incrementally parse a /api/recommend body, keeping only the fields that get rendered"""
+    # Parsing overlaps with the network read, and the backtest series (the bulk of the payload)
+    # are never collected into lists
+    portfolio: Dict[str, Any] = {'allocations': {}}
+    backtest: Dict[str, Any] = {}
+    data: Dict[str, Any] = {'portfolio': portfolio, 'backtest': backtest}
+    allocations = portfolio['allocations']
+    stock = None
+    stock_prefix = ""
     
-    def create_health_check_tool(self) -> Tool:
-        """Create tool to check API health"""
-        def health_check() -> str:
-            """Check if api is working"""
-            try:
-                response = requests.get(f"{self.api_base_url}/health", timeout=10)
-                if response.status_code == 200:
-                    return "API is healthy"
-                else:
-                    return f"API  status code: {response.status_code}"
-            except Exception as e:
-                return f"API health check failed: {str(e)}"
-        
-        return Tool(
-            name="health_check",
-            description="Check if the stock advisory API is healthy and running",
-            func=health_check
+    async for prefix, event, value in ijson.parse_async(content, use_float=True):
+        if event == 'map_key' and prefix == 'portfolio.allocations':
+            stock = value
+            stock_prefix = f"portfolio.allocations.{stock}."
+            allocations[stock] = {}
+        elif stock is not None and prefix.startswith(stock_prefix):
+            field = prefix[len(stock_prefix):]
+            if field in _ALLOCATION_FIELDS:
+                allocations[stock][field] = value
+        elif prefix in ('success', 'message'):
+            data[prefix] = value
+        else:
+            section, _, field = prefix.partition('.')
+            if section == 'portfolio' and field in _PORTFOLIO_FIELDS:
+                portfolio[field] = value
+            elif section == 'backtest' and field in _BACKTEST_FIELDS:
+                backtest[field] = value
+    
+    return data
+
+
+def _cache_key(url: str, data: Optional[bytes] = None) -> bytes:
+    """Fixed-size digest of a request URL and optional body, used to key caches and in-flight requests"""
+    digest = hashlib.blake2b(url.encode(), digest_size=16)
+    if data:
+        digest.update(data)
+    return digest.digest()
+
+
+class _ServerError(Exception):
+    """A 5xx response to a GET, raised inside the retry loop so tenacity retries it"""
+    
+    def __init__(self, status: int):
+        super().__init__(f"server error {status}")
+        self.status = status
+
+
+def _retryable(method: str, exc: BaseException) -> bool:
+    """Whether a failed attempt is worth repeating; 4xx responses never are"""
+    # A connection that was never established is safe to retry for any method, while a POST that
+    # dropped, timed out or got a 5xx may already have taken effect
+    if isinstance(exc, aiohttp.ClientConnectorError):
+        return True
+    return method == "GET" and isinstance(exc, (_ServerError, aiohttp.ClientConnectionError, asyncio.TimeoutError))
+
+
+def _parse_symbols(text: str) -> List[str]:
+    """Split user-typed tickers into unique uppercase symbols, keeping their first-seen order"""
+    return list(dict.fromkeys(s for s in _SYMBOL_SEP_RE.split(text.upper()) if s))
+
+
+def _consume_exception(task: "asyncio.Task") -> None:
+    """Mark a shared request's exception as retrieved even if every waiter was cancelled"""
+    if not task.cancelled():
+        task.exception()
+
+
+async def _read_body(response: aiohttp.ClientResponse) -> bytes:
+    """Default response reader: buffer the whole body"""
+    return await response.read()
+
+
+async def _read_recommendation(response: aiohttp.ClientResponse) -> Any:
+    """Stream-parse large recommendation bodies when ijson is available, otherwise buffer them"""
+    # Content-Length is the compressed size once the API encodes its responses, which says nothing
+    # about how big the decoded JSON is, so compressed bodies are treated as being of unknown size
+    size = None if response.headers.get(aiohttp.hdrs.CONTENT_ENCODING) else response.content_length
+    if ijson is not None and (size is None or size >= _STREAM_MIN_BYTES):
+        return await _stream_recommendation(response.content)
+    return await response.read()
+
+
+class RiskTolerance(str, Enum):
+    """Risk tolerance levels understood by the recommendation API"""
+    CONSERVATIVE = "conservative"
+    BALANCED = "balanced"
+    AGGRESSIVE = "aggressive"
+
+
+class TimeHorizon(str, Enum):
+    """Investment time horizons"""
+    SHORT_TERM = "short-term"
+    MEDIUM_TERM = "medium-term"
+    LONG_TERM = "long-term"
+
+
+@dataclass(slots=True, frozen=True)
+class UserProfile:
+    """User profile for stock recommendations, including the main parameters to be passed into the prediction agent"""
+    risk_tolerance: RiskTolerance
+    investment_amount: float
+    investment_goals: str
+    time_horizon: TimeHorizon
+
+
+@dataclass(slots=True, eq=False)
+class AgentCtx:
+    """State shared by the module-level tool functions: HTTP session, endpoint URLs and caches"""
+    urls: Dict[str, str]
+    # Shared HTTP session, created lazily on first tool call so it binds to the running loop
+    session: Optional[aiohttp.ClientSession] = None
+    api_initialized: bool = False
+    # Bumped on every successful init; cached cluster analysis is only valid for the generation it was built in
+    init_gen: int = 0
+    # (init generation, expires_at, formatted analysis) from the last successful get_clusters call
+    cluster_cache: Optional[Tuple[int, float, str]] = None
+    # LRU of raw GET bodies keyed by URL digest, each stored as (expires_at, body)
+    http_cache: "OrderedDict[bytes, Tuple[float, bytes]]" = field(default_factory=OrderedDict)
+    # Per URL digest, how many times invalidate() has dropped it; a GET that saw an invalidation land
+    # while it was on the wire may carry the old body, so it is not stored
+    invalidations: Dict[bytes, int] = field(default_factory=dict)
+    # Requests currently on the wire, keyed by method, URL and body, so identical concurrent calls share one
+    inflight: Dict[bytes, "asyncio.Task"] = field(default_factory=dict)
+    deduplicated_requests: int = 0
+    # This context's alru_cache over _fetch_recommendations, built on first use. Held here rather than
+    # at module level so cached entries and their TTL timers never keep a closed context alive.
+    recommendations: Optional[Callable[..., Any]] = None
+    
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Get the shared aiohttp session, creating it on first use"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                # No session-wide timeout: every request passes its own, see _send
+                connector=aiohttp.TCPConnector(limit=20, keepalive_timeout=60),
+                headers=_SESSION_HEADERS
+            )
+        return self.session
+    
+    async def aclose(self) -> None:
+        """Close the shared HTTP session and drop cached recommendations"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        if self.recommendations is not None:
+            self.recommendations.cache_clear()
+            self.recommendations = None
+    
+    async def request(self, method: str, url: str, *, timeout: float, data: Optional[bytes] = None,
+                      reader: Callable[[aiohttp.ClientResponse], Any] = _read_body) -> Tuple[int, Any]:
+        """Send a request over the shared session and return (status, body)"""
+        # Concurrent calls with the same method, URL and body (e.g. two get_clusters calls in one
+        # turn, or overlapping /api/init posts) share a single in-flight request
+        key = _cache_key(f"{method} {url}", data)
+        task = self.inflight.get(key)
+        if task is not None:
+            self.deduplicated_requests += 1
+        else:
+            task = asyncio.ensure_future(self._send(method, url, timeout=timeout, data=data, reader=reader))
+            self.inflight[key] = task
+            task.add_done_callback(lambda t: self.inflight.pop(key, None))
+            task.add_done_callback(_consume_exception)
+        # Shield so one caller being cancelled doesn't cancel the request for the others
+        return await asyncio.shield(task)
+    
+    async def _send(self, method: str, url: str, *, timeout: float, data: Optional[bytes],
+                    reader: Callable[[aiohttp.ClientResponse], Any]) -> Tuple[int, Any]:
+        """Perform a single request with retries, reading the body with reader only for 200 responses"""
+        session = await self.get_session()
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(_RETRY_ATTEMPTS),
+            wait=wait_exponential(multiplier=_RETRY_BACKOFF, max=_RETRY_BACKOFF_MAX),
+            retry=retry_if_exception(partial(_retryable, method)),
+            reraise=True
         )
+        # timeout bounds each socket read on top of a short connect timeout, and both together bound each attempt
+        request_timeout = aiohttp.ClientTimeout(total=_CONNECT_TIMEOUT + timeout,
+                                                sock_connect=_CONNECT_TIMEOUT, sock_read=timeout)
+        try:
+            async for attempt in retrying:
+                with attempt:
+                    async with session.request(method, url, data=data, timeout=request_timeout) as response:
+                        status = response.status
+                        if method == "GET" and status >= 500:
+                            raise _ServerError(status)
+                        return status, (await reader(response) if status == 200 else None)
+        except _ServerError as e:
+            # Attempts ran out; the 5xx is returned like any other status
+            return e.status, None
     
-    def create_init_tool(self) -> Tool:
-        """Create tool to initialize the stock advisory system"""
-        def initialize_system() -> str:
-            """Initialize the stock advisory system with market data using api init"""
-            try:
-                response = requests.post(f"{self.api_base_url}/api/init", timeout=30)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('success'):
-                        self.api_initialized = True
-                        clusters = data.get('clusters', {})
-                        total_stocks = data.get('total_stocks', 0)
-                        
-                        cluster_summary = []
-                        for cluster_id, cluster_data in clusters.items():
-                            cluster_summary.append(
-                                f"Cluster {cluster_id}: {cluster_data['size']} stocks, "
-                                f"Risk Level: {cluster_data['risk_level']}, "
-                                f"Avg Return: {cluster_data['avg_return']:.2%}, "
-                                f"Avg Volatility: {cluster_data['avg_volatility']:.2%}"
-                            )
-                        
-                        return f"""System initialized successfully!
+    async def cached_get(self, url: str, *, timeout: float, ttl: float = _GET_CACHE_TTL) -> Tuple[int, Any]:
+        """GET through a small TTL + LRU cache; only 200 responses are stored"""
+        # Tools share one event loop thread and no cache access spans an await, so no lock is needed
+        key = _cache_key(url)
+        hit = self.http_cache.get(key)
+        if hit is not None and hit[0] > time.monotonic():
+            self.http_cache.move_to_end(key)
+            return 200, hit[1]
+        
+        generation = self.invalidations.get(key, 0)
+        status, raw = await self.request("GET", url, timeout=timeout)
+        if status == 200 and self.invalidations.get(key, 0) == generation:
+            self.http_cache[key] = (time.monotonic() + ttl, raw)
+            self.http_cache.move_to_end(key)
+            while len(self.http_cache) > _GET_CACHE_MAX:
+                self.http_cache.popitem(last=False)
+        return status, raw
+    
+    def invalidate(self, *urls: str) -> None:
+        """Drop cached GET responses for the given URLs after a write that changes them"""
+        for url in urls:
+            key = _cache_key(url)
+            self.http_cache.pop(key, None)
+            self.invalidations[key] = self.invalidations.get(key, 0) + 1
+    
+    def loads(self, raw: bytes) -> Any:
+        """Decode an API response body with orjson, or stdlib json when it is not installed"""
+        return _json_loads(raw)
+
+
+async def health_check(ctx: AgentCtx) -> str:
+    """Check if api is working"""
+    try:
+        status, raw = await ctx.cached_get(ctx.urls['health'], timeout=3)
+        data = ctx.loads(raw) if status == 200 else None
+        if status == 200:
+            if data.get('status') != 'ok':
+                return f"API reported status: {data.get('status', 'unknown')}"
+            return "API is healthy"
+        else:
+            return f"API  status code: {status}"
+    except Exception as e:
+        return f"API health check failed: {str(e)}"
+
+
+def _num(value: Any) -> Any:
+    """Map JSON null, which is how the API encodes NaN and inf, back to NaN so format specs still apply"""
+    return float('nan') if value is None else value
+
+
+def _format_cluster_detail(cluster_id: Any, cluster_data: Any) -> str:
+    """Render one cluster's block of the get_clusters analysis"""
+    get = cluster_data.get
+    stocks = get('stocks', [])
+    return _CLUSTER_DETAIL_TMPL.format_map({
+        'cluster_id': cluster_id,
+        'risk_level': get('risk_level', 'Unknown'),
+        'size': get('size', 0),
+        'avg_return': _num(get('avg_return', 0)),
+        'avg_volatility': _num(get('avg_volatility', 0)),
+        'avg_sharpe': _num(get('avg_sharpe', 0)),
+        'sample_stocks': ', '.join(stocks[:5]) + ('...' if len(stocks) > 5 else '')
+    })
+
+
+class _ApiCall(NamedTuple):
+    """How a tool calls its endpoint and renders a successful response"""
+    method: str
+    url_key: str
+    # Read timeout in seconds; connecting is bounded separately by _CONNECT_TIMEOUT
+    timeout: float
+    # Renders the decoded body of a 200 response whose 'success' flag is set; never touches state
+    render: Callable[[Any], str]
+    # Prefix for a response with success unset, and for an exception raised during the call
+    failure: str
+    error: str
+    # GETs served through ctx.cached_get
+    cached: bool = False
+    # URL keys whose cached GET responses are stale after a successful call
+    invalidates: Tuple[str, ...] = ()
+
+
+async def _call_api(ctx: AgentCtx, call: _ApiCall, payload: Any = None) -> Tuple[bool, str]:
+    """Run one API tool call and return (succeeded, text to show), rendering or describing the failure"""
+    try:
+        url = ctx.urls[call.url_key]
+        if call.cached:
+            status, raw = await ctx.cached_get(url, timeout=call.timeout)
+        else:
+            body = _json_dumps(payload) if payload is not None else None
+            status, raw = await ctx.request(call.method, url, data=body, timeout=call.timeout)
+        if status != 200:
+            return False, f"API returned status code: {status}"
+        data = ctx.loads(raw)
+        if not data.get('success'):
+            return False, f"{call.failure}: {data.get('message', 'Unknown error')}"
+        ctx.invalidate(*(ctx.urls[key] for key in call.invalidates))
+        return True, call.render(data)
+    except Exception as e:
+        return False, f"{call.error}: {str(e)}"
+
+
+def _render_init(data: Any) -> str:
+    clusters = data.get('clusters', {})
+    total_stocks = data.get('total_stocks', 0)
+    
+    summary_text = "\n".join(
+        _CLUSTER_SUMMARY_TMPL.format(id=cluster_id, size=d['size'], risk_level=d['risk_level'],
+                                     avg_return=_num(d['avg_return']), avg_volatility=_num(d['avg_volatility']))
+        for cluster_id, d in clusters.items()
+    )
+    
+    return f"""System initialized successfully!
                         
 Total stocks analyzed: {total_stocks}
 
 Stock Clusters:
-{chr(10).join(cluster_summary)}
+{summary_text}
 
 The system is now ready to provide personalized recommendations."""
-                    else:
-                        return f"Initialization failed: {data.get('message', 'Unknown error')}"
-                else:
-                    return f"API returned status code: {response.status_code}"
-            except Exception as e:
-                return f"Initialization failed: {str(e)}"
-        
-        return Tool(
-            name="initialize_system",
-            description="Initialize the stock advisory system with market data",
-            func=initialize_system
-        )
+
+
+def _render_clusters(data: Any) -> str:
+    clusters = data.get('clusters', {})
     
-    def create_clusters_tool(self) -> Tool:
-        """Create tool to get stock cluster analysis"""
-        def get_clusters() -> str:
-            """Get detailed analysis of stock clusters"""
-            try:
-                response = requests.get(f"{self.api_base_url}/api/clusters", timeout=15)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('success'):
-                        clusters = data.get('clusters', {})
-                        
-                        cluster_analysis = []
-                        for cluster_id, cluster_data in clusters.items():
-                            stocks = cluster_data.get('stocks', [])
-                            cluster_analysis.append(f"""
-Cluster {cluster_id} ({cluster_data.get('risk_level', 'Unknown')} Risk):
-- Number of stocks: {cluster_data.get('size', 0)}
-- Average annual return: {cluster_data.get('avg_return', 0):.2%}
-- Average volatility: {cluster_data.get('avg_volatility', 0):.2%}
-- Average Sharpe ratio: {cluster_data.get('avg_sharpe', 0):.2f}
-- Sample stocks: {', '.join(stocks[:5])}{'...' if len(stocks) > 5 else ''}
-""")
-                        
-                        return f"Stock Cluster Analysis:{''.join(cluster_analysis)}"
-                    else:
-                        return f"Failed to get clusters: {data.get('message', 'Unknown error')}"
-                else:
-                    return f"API returned status code: {response.status_code}"
-            except Exception as e:
-                return f"Failed to get clusters: {str(e)}"
-        
-        return Tool(
-            name="get_clusters",
-            description="Get detailed analysis of stock clusters and their characteristics from api call ",
-            func=get_clusters
-        )
+    details = "".join(
+        _format_cluster_detail(cluster_id, cluster_data)
+        for cluster_id, cluster_data in clusters.items()
+    )
     
-    def create_recommend_tool(self) -> Tool:
-        """Create tool to get stock recommendations"""
-        def get_recommendations(risk_tolerance: str, investment_amount: float, investment_goals: str = "") -> str:
-            """Get personalized stock recommendations based on risk tolerance and investment amount
-            
-            Args:
-                risk_tolerance: 'conservative', 'balanced', or 'aggressive'
-                investment_amount: Amount to invest in dollars
-                investment_goals: Optional description of investment goals
-            """
-            try:
-                payload = {
-                    "risk_tolerance": risk_tolerance,
-                    "investment_amount": investment_amount,
-                    "investment_goals": investment_goals
-                }
-                
-                response = requests.post(f"{self.api_base_url}/api/recommend", 
-                                       json=payload, timeout=30)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('success'):
-                        portfolio = data.get('portfolio', {})
-                        backtest = data.get('backtest', {})
-                        
-                        # Format allocations
-                        allocations = portfolio.get('allocations', {})
-                        allocation_text = []
-                        for stock, details in allocations.items():
-                            weight = details.get('weight', 0)
-                            dollar_amount = details.get('dollar_amount', 0)
-                            shares = details.get('shares', 0)
-                            allocation_text.append(
-                                f"- {stock}: {weight:.1%} (${dollar_amount:,.2f}, {shares} shares)"
-                            )
-                        
-                        # Format backtest results
-                        backtest_summary = ""
-                        if backtest:
-                            backtest_summary = f"""
-Historical Performance (Backtest):
-- Total Return: {backtest.get('total_return', 0):.2%}
-- Annual Return: {backtest.get('annual_return', 0):.2%}
-- Volatility: {backtest.get('volatility', 0):.2%}
-- Sharpe Ratio: {backtest.get('sharpe_ratio', 0):.2f}
-- Maximum Drawdown: {backtest.get('max_drawdown', 0):.2%}
-"""
-                        
-                        return f"""Stock Recommendations for {risk_tolerance.title()} Risk Profile:
+    return f"Stock Cluster Analysis:{details}"
 
-Portfolio Summary:
-- Total Investment: ${portfolio.get('total_investment', 0):,.2f}
-- Expected Annual Return: {portfolio.get('expected_return', 0):.2%}
-- Portfolio Volatility: {portfolio.get('volatility', 0):.2%}
-- Sharpe Ratio: {portfolio.get('sharpe_ratio', 0):.2f}
 
-Recommended Allocations:
-{chr(10).join(allocation_text)}
-{backtest_summary}
+def _render_added(data: Any) -> str:
+    added = data.get('added', [])
+    failed = data.get('failed', [])
+    total = data.get('total_custom_stocks', 0)
+    
+    message = f"Successfully added {len(added)} custom stocks to the portfolio."
+    if added:
+        message += f" Added: {', '.join(added)}."
+    if failed:
+        message += f" Failed: {', '.join(failed)}."
+    message += f" Total custom stocks: {total}."
+    
+    return message
 
-Investment Goals Considered: {investment_goals or 'Not specified'}
 
-Note: These are algorithmic recommendations. Please consult with a financial advisor before making investment decisions. Past performance does not guarantee future results."""
-                    else:
-                        return f"Recommendation failed: {data.get('message', 'Unknown error')}"
-                else:
-                    return f"API returned status code: {response.status_code}"
-            except Exception as e:
-                return f"Recommendation failed: {str(e)}"
-        
-        return Tool(
-            name="get_recommendations",
-            description="Get personalized stock recommendations based on risk tolerance and investment amount",
-            func=get_recommendations
-        )
+def _render_removed(data: Any) -> str:
+    removed = data.get('removed', [])
+    not_found = data.get('not_found', [])
+    total = data.get('total_custom_stocks', 0)
     
-    def create_add_custom_stocks_tool(self) -> Tool:
-        """Create tool to add custom stocks to the portfolio"""
-        def add_custom_stocks(stock_symbols: str) -> str:
-            """Add custom stocks to the portfolio for analysis
-            
-            Args:
-                stock_symbols: Comma-separated list of stock symbols (e.g., "PLTR,MKL,RBLX")
-            """
-            try:
-                # Parse stock symbols
-                stocks = [s.strip().upper() for s in stock_symbols.split(',')]
-                
-                payload = {"stocks": stocks}
-                response = requests.post(f"{self.api_base_url}/api/stocks/add", 
-                                       json=payload, timeout=15)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('success'):
-                        added = data.get('added', [])
-                        failed = data.get('failed', [])
-                        total = data.get('total_custom_stocks', 0)
-                        
-                        message = f"Successfully added {len(added)} custom stocks to the portfolio."
-                        if added:
-                            message += f" Added: {', '.join(added)}."
-                        if failed:
-                            message += f" Failed: {', '.join(failed)}."
-                        message += f" Total custom stocks: {total}."
-                        
-                        return message
-                    else:
-                        return f"Failed to add stocks: {data.get('message', 'Unknown error')}"
-                else:
-                    return f"API returned status code: {response.status_code}"
-            except Exception as e:
-                return f"Failed to add custom stocks: {str(e)}"
-        
-        return Tool(
-            name="add_custom_stocks",
-            description="Add custom stocks to the portfolio for analysis. Input should be comma-separated stock symbols.",
-            func=add_custom_stocks
-        )
+    message = f"Successfully removed {len(removed)} custom stocks from the portfolio."
+    if removed:
+        message += f" Removed: {', '.join(removed)}."
+    if not_found:
+        message += f" Not found: {', '.join(not_found)}."
+    message += f" Total custom stocks: {total}."
     
-    def create_remove_custom_stocks_tool(self) -> Tool:
-        """Create tool to remove custom stocks from the portfolio"""
-        def remove_custom_stocks(stock_symbols: str) -> str:
-            """Remove custom stocks from the portfolio
-            
-            Args:
-                stock_symbols: Comma-separated list of stock symbols to remove
-            """
-            try:
-                # Parse stock symbols
-                stocks = [s.strip().upper() for s in stock_symbols.split(',')]
-                
-                payload = {"stocks": stocks}
-                response = requests.post(f"{self.api_base_url}/api/stocks/remove", 
-                                       json=payload, timeout=15)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('success'):
-                        removed = data.get('removed', [])
-                        not_found = data.get('not_found', [])
-                        total = data.get('total_custom_stocks', 0)
-                        
-                        message = f"Successfully removed {len(removed)} custom stocks from the portfolio."
-                        if removed:
-                            message += f" Removed: {', '.join(removed)}."
-                        if not_found:
-                            message += f" Not found: {', '.join(not_found)}."
-                        message += f" Total custom stocks: {total}."
-                        
-                        return message
-                    else:
-                        return f"Failed to remove stocks: {data.get('message', 'Unknown error')}"
-                else:
-                    return f"API returned status code: {response.status_code}"
-            except Exception as e:
-                return f"Failed to remove custom stocks: {str(e)}"
-        
-        return Tool(
-            name="remove_custom_stocks",
-            description="Remove custom stocks from the portfolio. Input should be comma-separated stock symbols.",
-            func=remove_custom_stocks
-        )
+    return message
+
+
+def _render_list(data: Any) -> str:
+    custom_stocks = data.get('custom_stocks', [])
+    total_custom = data.get('total_custom_stocks', 0)
+    total_available = data.get('total_available_stocks', 0)
+    sp500_count = data.get('sp500_stocks_count', 0)
     
-    def create_list_custom_stocks_tool(self) -> Tool:
-        """Create tool to list custom stocks"""
-        def list_custom_stocks() -> str:
-            """Get list of custom stocks in the portfolio"""
-            try:
-                response = requests.get(f"{self.api_base_url}/api/stocks/list", timeout=10)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('success'):
-                        custom_stocks = data.get('custom_stocks', [])
-                        total_custom = data.get('total_custom_stocks', 0)
-                        total_available = data.get('total_available_stocks', 0)
-                        sp500_count = data.get('sp500_stocks_count', 0)
-                        
-                        if custom_stocks:
-                            return f"""Custom Stocks in Portfolio:
+    if custom_stocks:
+        return f"""Custom Stocks in Portfolio:
 {', '.join(custom_stocks)}
 
 Summary:
 - Custom stocks: {total_custom}
 - S&P 500 stocks: {sp500_count}
 - Total available stocks: {total_available}"""
-                        else:
-                            return f"""No custom stocks added yet.
+    else:
+        return f"""No custom stocks added yet.
 
 Summary:
 - Custom stocks: {total_custom}
@@ -394,75 +535,315 @@ Summary:
 - Total available stocks: {total_available}
 
 You can add custom stocks using the add_custom_stocks tool."""
-                    else:
-                        return f"Failed to get stock list: {data.get('message', 'Unknown error')}"
-                else:
-                    return f"API returned status code: {response.status_code}"
-            except Exception as e:
-                return f"Failed to get custom stocks: {str(e)}"
-        
-        return Tool(
-            name="list_custom_stocks",
-            description="Get list of custom stocks currently in the portfolio",
-            func=list_custom_stocks
-        )
+
+
+def _render_cleared(data: Any) -> str:
+    return f"Successfully cleared {data.get('removed_count', 0)} custom stocks from the portfolio."
+
+
+# Endpoint, timeout, rendering and messages for every tool built on _call_api
+_API_CALLS: Dict[str, _ApiCall] = {
+    'initialize_system': _ApiCall("POST", 'init', 30, _render_init,
+                                  "Initialization failed", "Initialization failed"),
+    'get_clusters': _ApiCall("GET", 'clusters', 10, _render_clusters,
+                             "Failed to get clusters", "Failed to get clusters"),
+    'add_custom_stocks': _ApiCall("POST", 'add', 15, _render_added,
+                                  "Failed to add stocks", "Failed to add custom stocks", invalidates=('list',)),
+    'remove_custom_stocks': _ApiCall("POST", 'remove', 5, _render_removed,
+                                     "Failed to remove stocks", "Failed to remove custom stocks", invalidates=('list',)),
+    'list_custom_stocks': _ApiCall("GET", 'list', 5, _render_list,
+                                   "Failed to get stock list", "Failed to get custom stocks", cached=True),
+    'clear_custom_stocks': _ApiCall("POST", 'clear', 5, _render_cleared,
+                                    "Failed to clear stocks", "Failed to clear custom stocks", invalidates=('list',)),
+}
+
+
+async def initialize_system(ctx: AgentCtx) -> str:
+    """Initialize the stock advisory system with market data using api init"""
+    ok, message = await _call_api(ctx, _API_CALLS['initialize_system'])
+    if ok:
+        ctx.api_initialized = True
+        # Clusters are recomputed on init, which invalidates any cached analysis
+        ctx.init_gen += 1
+    return message
+
+
+async def get_clusters(ctx: AgentCtx) -> str:
+    """Get detailed analysis of stock clusters"""
+    cached = ctx.cluster_cache
+    if cached is not None and cached[0] == ctx.init_gen and cached[1] > time.monotonic():
+        return cached[2]
+    ok, formatted = await _call_api(ctx, _API_CALLS['get_clusters'])
+    if ok:
+        ctx.cluster_cache = (ctx.init_gen, time.monotonic() + _CLUSTER_CACHE_TTL, formatted)
+    return formatted
+
+
+class _ToolFailure(Exception):
+    """Carries the message a tool should return; raised so that failures are never cached"""
+
+
+async def _fetch_recommendations(ctx: AgentCtx, init_gen: int, risk: RiskTolerance, investment_amount: float, investment_goals: str) -> str:
+    """Fetch and format recommendations, cached per context by (init generation, risk, amount, goals)"""
+    # init_gen is only part of the cache key, so entries from before a re-init are never served
+    payload = {
+        "risk_tolerance": risk.value,
+        "investment_amount": investment_amount,
+        "investment_goals": investment_goals
+    }
     
-    def create_clear_custom_stocks_tool(self) -> Tool:
-        """Create tool to clear all custom stocks"""
-        def clear_custom_stocks() -> str:
-            """Clear all custom stocks from the portfolio"""
-            try:
-                response = requests.post(f"{self.api_base_url}/api/stocks/clear", timeout=10)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('success'):
-                        removed_count = data.get('removed_count', 0)
-                        return f"Successfully cleared {removed_count} custom stocks from the portfolio."
-                    else:
-                        return f"Failed to clear stocks: {data.get('message', 'Unknown error')}"
-                else:
-                    return f"API returned status code: {response.status_code}"
-            except Exception as e:
-                return f"Failed to clear custom stocks: {str(e)}"
+    status, body = await ctx.request("POST", ctx.urls['recommend'], data=_json_dumps(payload), timeout=30, reader=_read_recommendation)
+    
+    if status == 200:
+        # ijson hands back the already-parsed fields; a buffered body still needs decoding
+        data = body if isinstance(body, dict) else ctx.loads(body)
+        if data.get('success'):
+            portfolio = data.get('portfolio', {})
+            backtest = data.get('backtest', {})
+            
+            # Format allocations; the API always sends weight, dollar_amount and shares per stock
+            allocations = portfolio.get('allocations', {})
+            allocation_text = "\n".join(
+                f"- {s}: {d['weight']:.1%} (${d['dollar_amount']:,.2f}, {d['shares']} shares)"
+                for s, d in allocations.items()
+            )
+            
+            # Format backtest results
+            backtest_summary = ""
+            if backtest:
+                backtest_summary = _BACKTEST_TMPL.format_map({
+                    'total_return': _num(backtest.get('total_return', 0)),
+                    'annual_return': _num(backtest.get('annual_return', 0)),
+                    'volatility': _num(backtest.get('volatility', 0)),
+                    'sharpe_ratio': _num(backtest.get('sharpe_ratio', 0)),
+                    'max_drawdown': _num(backtest.get('max_drawdown', 0))
+                })
+            
+            return _RECOMMEND_TMPL.format_map({
+                'risk_title': risk.value.title(),
+                'total_investment': portfolio.get('total_investment', 0),
+                'expected_return': _num(portfolio.get('expected_return', 0)),
+                'volatility': _num(portfolio.get('volatility', 0)),
+                'sharpe_ratio': _num(portfolio.get('sharpe_ratio', 0)),
+                'allocation_text': allocation_text,
+                'backtest_summary': backtest_summary,
+                'investment_goals': investment_goals or 'Not specified'
+            })
+        else:
+            raise _ToolFailure(f"Recommendation failed: {data.get('message', 'Unknown error')}")
+    else:
+        raise _ToolFailure(f"API returned status code: {status}")
+
+
+async def get_recommendations(ctx: AgentCtx, risk_tolerance: str, investment_amount: float, investment_goals: str = "") -> str:
+    """Get personalized stock recommendations based on risk tolerance and investment amount
+    
+    Args:
+        risk_tolerance: 'conservative', 'balanced', or 'aggressive'
+        investment_amount: Amount to invest in dollars
+        investment_goals: Optional description of investment goals
+    """
+    try:
+        # Parse the LLM-supplied string once; an unknown level fails here instead of at the API
+        risk = RiskTolerance(risk_tolerance.strip().lower())
+        fetch = ctx.recommendations
+        if fetch is None:
+            # ctx is bound by the partial, so it is not part of the cache key
+            fetch = ctx.recommendations = alru_cache(maxsize=128, ttl=300)(partial(_fetch_recommendations, ctx))
+        return await fetch(ctx.init_gen, risk, float(investment_amount), investment_goals)
+    except _ToolFailure as e:
+        return str(e)
+    except Exception as e:
+        return f"Recommendation failed: {str(e)}"
+
+
+async def add_custom_stocks(ctx: AgentCtx, stock_symbols: str) -> str:
+    """Add custom stocks to the portfolio for analysis
+    
+    Args:
+        stock_symbols: Comma-separated list of stock symbols (e.g., "PLTR,MKL,RBLX")
+    """
+    stocks = _parse_symbols(stock_symbols)
+    _, message = await _call_api(ctx, _API_CALLS['add_custom_stocks'], {"stocks": stocks})
+    return message
+
+
+async def remove_custom_stocks(ctx: AgentCtx, stock_symbols: str) -> str:
+    """Remove custom stocks from the portfolio
+    
+    Args:
+        stock_symbols: Comma-separated list of stock symbols to remove
+    """
+    stocks = _parse_symbols(stock_symbols)
+    _, message = await _call_api(ctx, _API_CALLS['remove_custom_stocks'], {"stocks": stocks})
+    return message
+
+
+async def list_custom_stocks(ctx: AgentCtx) -> str:
+    """Get list of custom stocks in the portfolio"""
+    _, message = await _call_api(ctx, _API_CALLS['list_custom_stocks'])
+    return message
+
+
+async def clear_custom_stocks(ctx: AgentCtx) -> str:
+    """Clear all custom stocks from the portfolio"""
+    _, message = await _call_api(ctx, _API_CALLS['clear_custom_stocks'])
+    return message
+
+
+# (name, description, function) for every API tool, bound to an agent's AgentCtx at construction
+_TOOL_SPECS: Tuple[Tuple[str, str, Callable[..., Any]], ...] = (
+    ("initialize_system", "Initialize the stock advisory system with market data", initialize_system),
+    ("get_clusters", "Get detailed analysis of stock clusters and their characteristics from api call ", get_clusters),
+    ("get_recommendations", "Get personalized stock recommendations based on risk tolerance and investment amount", get_recommendations),
+    ("health_check", "Check if the stock advisory API is healthy and running", health_check),
+    ("add_custom_stocks", "Add custom stocks to the portfolio for analysis. Input should be comma-separated stock symbols.", add_custom_stocks),
+    ("remove_custom_stocks", "Remove custom stocks from the portfolio. Input should be comma-separated stock symbols.", remove_custom_stocks),
+    ("list_custom_stocks", "Get list of custom stocks currently in the portfolio", list_custom_stocks),
+    ("clear_custom_stocks", "Clear all custom stocks from the portfolio", clear_custom_stocks),
+)
+
+
+def _bind_tool(ctx: AgentCtx, name: str, description: str, func: Callable[..., Any]) -> Tool:
+    """Wrap a module-level tool function as a Tool bound to the given context"""
+    bound = partial(func, ctx)
+    # Keep the name and Args docs visible to the tool schema without exposing ctx via __wrapped__
+    bound.__name__ = func.__name__
+    bound.__doc__ = func.__doc__
+    return Tool(name=name, description=description, func=bound)
+
+
+class StockAdvisorAgent:
+    """Class built on top of smolagents api"""
+    
+    __slots__ = ("api_base_url", "ctx", "tools", "_init_task", "_init_error", "_llm", "_agent")
+    
+    def __init__(self, api_base_url: str = "http://localhost:5000"):
+        self.api_base_url = api_base_url
+        # Model client and agent are built on first use, see the llm and agent properties
+        self._llm: Optional[LiteLLMModel] = None
+        self._agent: Optional[ToolCallingAgent] = None
         
-        return Tool(
-            name="clear_custom_stocks",
-            description="Clear all custom stocks from the portfolio",
-            func=clear_custom_stocks
+        # Endpoint URLs are fixed for the agent's lifetime, so build them once
+        b = api_base_url.rstrip("/")
+        self.ctx = AgentCtx(
+            urls={
+                "health": f"{b}/health",
+                "init": f"{b}/api/init",
+                "clusters": f"{b}/api/clusters",
+                "recommend": f"{b}/api/recommend",
+                "add": f"{b}/api/stocks/add",
+                "remove": f"{b}/api/stocks/remove",
+                "list": f"{b}/api/stocks/list",
+                "clear": f"{b}/api/stocks/clear"
+            }
         )
+        
+        # Initialize the stock advisory API tools with the smolagents api
+        self.tools = [FinalAnswerTool()] + [
+            _bind_tool(self.ctx, name, description, func) for name, description, func in _TOOL_SPECS
+        ]
+        
+        # Start /api/init speculatively so it runs while the user is still typing. Without a
+        # running loop there is nothing to schedule on, and the first chat turn starts it instead.
+        self._init_task: Optional[asyncio.Task] = None
+        # Message from the last failed init; it may have run in the background, so chat() reports it
+        self._init_error: Optional[str] = None
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            self._init_task = asyncio.create_task(self.initialize_api())
+    
+    @property
+    def llm(self) -> LiteLLMModel:
+        """Model client, built on first use so paths that never reach the LLM skip litellm setup"""
+        if self._llm is None:
+            self._llm = LiteLLMModel(model_id="gpt-4o-mini")
+        return self._llm
+    
+    @property
+    def agent(self) -> ToolCallingAgent:
+        """Tool-calling agent, built on the first chat turn together with the model client"""
+        if self._agent is None:
+            self._agent = ToolCallingAgent(
+                name="StockAdvisor",
+                description="An AI agent that provides personalized stock recommendations based on user risk tolerance and investment goals",
+                tools=self.tools,
+                llm=self.llm, 
+                system_prompt=_SYSTEM_PROMPT
+            )
+        return self._agent
+    
+    @property
+    def api_initialized(self) -> bool:
+        """Whether the API has been initialized, as tracked in the tools' shared context"""
+        return self.ctx.api_initialized
+    
+    async def aclose(self) -> None:
+        """Cancel a pending init and close the shared HTTP session"""
+        if self._init_task is not None and not self._init_task.done():
+            self._init_task.cancel()
+        await self.ctx.aclose()
+    
+    async def __aenter__(self) -> "StockAdvisorAgent":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
     
     async def chat(self, message: str) -> str:
         """Chat with the stock advisor agent"""
         try:
-            # Ensure API is initialized
-            if not self.api_initialized:
-                await self.initialize_api()
+            # Ensure API is initialized, waiting on the speculative init if it is still running
+            if not self.api_initialized and not await self._ensure_initialized():
+                print(f"Failed to initialize API: {self._init_error}")
             
             response = await self.agent.arun(message)
             return response
         except Exception as e:
             return f"I apologize, but I encountered an error: {str(e)}. Please try again or check if the API is running."
     
+    async def warmup(self) -> list:
+        """Run the health check and cluster fetch concurrently, filling the cluster cache"""
+        return await asyncio.gather(health_check(self.ctx), get_clusters(self.ctx), return_exceptions=True)
+    
+    async def _ensure_initialized(self) -> bool:
+        """Await the pending init task, starting a fresh one if none is running or the last one failed"""
+        task = self._init_task
+        # A speculative init that already finished without initializing holds a stale False
+        if task is None or (task.done() and not self.api_initialized):
+            task = self._init_task = asyncio.ensure_future(self.initialize_api())
+        try:
+            return await task
+        finally:
+            if not self.api_initialized:
+                # Let the next turn retry a failed or cancelled init
+                self._init_task = None
+    
     async def initialize_api(self) -> bool:
         """Initialize the API if not already done"""
-        try:
-            response = await self.agent.arun("Please initialize the stock advisory system with market data")
-            self.api_initialized = "initialized successfully" in response.lower()
-            return self.api_initialized
-        except Exception as e:
-            print(f"Failed to initialize API: {e}")
-            return False
+        # Calls the init tool directly rather than through the LLM, saving a model round trip on
+        # cold start; the registered tool stays available for explicit re-inits
+        result = await initialize_system(self.ctx)
+        if self.api_initialized:
+            self._init_error = None
+            await self.warmup()
+        else:
+            # Not printed here: a speculative init finishes while the REPL prompt is on screen
+            self._init_error = result
+        return self.api_initialized
     
     def get_user_profile(self) -> UserProfile:
         """Get user profile through conversation"""
         # This would typically be done through a conversation interface
         # For demo purposes, returning a default profile
         return UserProfile(
-            risk_tolerance="balanced",
+            risk_tolerance=RiskTolerance.BALANCED,
             investment_amount=10000.0,
             investment_goals="Long-term growth with moderate risk",
-            time_horizon="long-term"
+            time_horizon=TimeHorizon.LONG_TERM
         )
 
 
@@ -481,30 +862,39 @@ async def main():
     print("- 'Analyze the current market clusters'")
     print("\nType 'quit' to exit.\n")
     
+    prompt_session = PromptSession()
+    
     # Interactive chat loop
-    while True:
-        try:
-            user_input = input("You: ").strip()
-            
-            if user_input.lower() in ['quit', 'exit', 'bye']:
-                print("Goodbye! Happy investing! 📈")
+    try:
+        while True:
+            try:
+                user_input = (await prompt_session.prompt_async("You: ")).strip()
+                
+                if user_input.lower() in ['quit', 'exit', 'bye']:
+                    print("Goodbye! Happy investing! 📈")
+                    break
+                
+                if not user_input:
+                    continue
+                
+                print("🤖 Agent: ", end="", flush=True)
+                response = await agent.chat(user_input)
+                # One write for the reply and its trailing blank line, then a single flush
+                sys.stdout.write(f"{response}\n\n")
+                sys.stdout.flush()
+                
+            except (KeyboardInterrupt, EOFError):
+                print("\nGoodbye! Happy investing! 📈")
                 break
-            
-            if not user_input:
-                continue
-            
-            print("🤖 Agent: ", end="", flush=True)
-            response = await agent.chat(user_input)
-            print(response)
-            print()
-            
-        except KeyboardInterrupt:
-            print("\nGoodbye! Happy investing! 📈")
-            break
-        except Exception as e:
-            print(f"Error: {e}")
-            print("Please try again.")
+            except Exception as e:
+                print(f"Error: {e}")
+                print("Please try again.")
+    finally:
+        await agent.aclose()
 
 
 if __name__ == "__main__":
+    # Only installed when run as a script so importers keep whatever loop policy they chose
+    if uvloop is not None:
+        uvloop.install()
     asyncio.run(main())
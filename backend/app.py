@@ -1,8 +1,18 @@
 import os
+import hashlib
+import json
+import threading
+from datetime import date
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import NamedTuple
+import requests
 import pandas as pd
-from flask import Flask
+from flask import Flask, Response
 from flask import jsonify, request, abort
 from flask_cors import CORS 
+from flask_compress import Compress
 import yfinance as yf
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
@@ -10,9 +20,153 @@ from scipy.optimize import minimize
 import numpy as np
 #from json import jsonify
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    import cvxpy as cp
+except ImportError:
+    cp = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Number of optimize_portfolio results kept for repeated recommendation requests
+OPTIMIZE_CACHE_SIZE = 256
+
+# Concurrent yfinance lookups when validating newly added custom symbols
+VALIDATION_WORKERS = 8
+
+# Daily close history is stored here as parquet, one file per (period, day, symbol set)
+PRICE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+
+# One keep-alive HTTP session shared by every yfinance Ticker
+_yf_session = requests.Session()
+
+
+@lru_cache(maxsize=128)
+def _ticker(symbol):
+    """Reuse Ticker objects (and the metadata they cache) across requests for the same symbol"""
+    return yf.Ticker(symbol, session=_yf_session)
+
+
+def _simple_returns(prices):
+    """Row-over-row simple returns of a (days x symbols) price array; one row shorter than the input"""
+    return np.diff(prices, axis=0) / prices[:-1]
+
+
+def _cum_dd(r):
+    """Cumulative growth of a return series and its maximum drawdown, computed in a single sweep"""
+    n = r.size
+    cum = np.empty(n)
+    running_max = -np.inf
+    max_dd = 0.0
+    c = 1.0
+    for i in range(n):
+        c *= 1.0 + r[i]
+        cum[i] = c
+        if c > running_max:
+            running_max = c
+        dd = (c - running_max) / running_max
+        if dd < max_dd:
+            max_dd = dd
+    return cum, max_dd
+
+
+def _net_sharpe(w, net_er, cov):
+    """Net return over volatility of weights w; called by SLSQP on every iteration"""
+    n = w.size
+    net_return = 0.0
+    variance = 0.0
+    for i in range(n):
+        net_return += w[i] * net_er[i]
+        cov_w = 0.0
+        for j in range(n):
+            cov_w += cov[i, j] * w[j]
+        variance += w[i] * cov_w
+    return net_return / np.sqrt(variance)
+
+
+def _net_sharpe_grad(w, net_er, cov):
+    """Gradient of _net_sharpe: net_er/sigma - net_return * (cov @ w)/sigma^3"""
+    n = w.size
+    cov_w = np.empty(n)
+    net_return = 0.0
+    variance = 0.0
+    for i in range(n):
+        net_return += w[i] * net_er[i]
+        acc = 0.0
+        for j in range(n):
+            acc += cov[i, j] * w[j]
+        cov_w[i] = acc
+        variance += w[i] * acc
+    sigma = np.sqrt(variance)
+    return net_er / sigma - net_return * cov_w / sigma ** 3
+
+
+# Compiled, the optimizer kernels skip NumPy's per-call dispatch overhead on these tiny arrays
+if njit is not None:
+    _cum_dd = njit(cache=True)(_cum_dd)
+    _net_sharpe = njit(cache=True)(_net_sharpe)
+    _net_sharpe_grad = njit(cache=True)(_net_sharpe_grad)
+else:
+    # Interpreted, the drawdown loop is still cheap for a few hundred points, but the optimizer
+    # kernels are faster as NumPy expressions than as Python loops
+    def _net_sharpe(w, net_er, cov):
+        """Net return over volatility of weights w"""
+        return (w @ net_er) / np.sqrt(w @ cov @ w)
+
+    def _net_sharpe_grad(w, net_er, cov):
+        """Gradient of _net_sharpe: net_er/sigma - net_return * (cov @ w)/sigma^3"""
+        cov_w = cov @ w
+        sigma = np.sqrt(w @ cov_w)
+        return net_er / sigma - (w @ net_er) * cov_w / sigma ** 3
+
+
+def _to_builtin(obj):
+    """json.dumps fallback for the numpy values orjson would serialize natively"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_response(payload, status=200):
+    """JSON response that serializes numpy arrays and scalars, and int dict keys, without .tolist()"""
+    if orjson is not None:
+        body = orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    else:
+        body = json.dumps(payload, default=_to_builtin)
+    return Response(body, status=status, mimetype='application/json')
+
+
+class MarketSnapshot(NamedTuple):
+    """Everything derived from one market data fetch
+    
+    Published with a single attribute assignment, so a request running on another thread reads
+    either the previous fetch or the new one, never a mix of both.
+    """
+    data: pd.DataFrame
+    returns: pd.DataFrame
+    # returns as a contiguous (days x symbols) float32 matrix plus symbol -> column index, so hot
+    # paths slice by integer columns instead of building DataFrames. Daily returns need nowhere near
+    # float64 precision, and float32 halves the memory every pass has to stream.
+    returns_mat: np.ndarray
+    sym_idx: dict
+    # Counts fetches; keys the caches derived from this snapshot so they are never mixed up
+    epoch: int
+
 
 app = Flask(__name__)
 CORS(app)
+# gzip/brotli-encode JSON responses (recommendations carry the full backtest series) for clients that accept it
+Compress(app)
 
 class StockAdvisor:
     #Stock ADvisor class with functionality to fetch historical, data, cluster stocks based on metrics, optimize portfolio and backtest
@@ -26,69 +180,140 @@ class StockAdvisor:
             'QCOM', 'DHR', 'UPS', 'PM', 'MS', 'HON', 'NEE', 'LOW', 'COP', 'AMGN'
         ]
         self.custom_symbols = []  # User-added custom stocks
-        self.data = None
-        self.returns = None
+        # Guards fetch_market_data and custom symbol edits when served by a threaded WSGI server
+        self._lock = threading.RLock()
+        # Latest MarketSnapshot, or None before the first fetch; data and returns read from it
+        self.market = None
         self.clusters = None
+        # (expected_returns, cov_matrix) numpy arrays per (epoch, ordered stock selection)
+        self._moments_cache = {}
+        # (epoch, analysis) from the last perform_clustering, served by /api/clusters for that epoch
+        self._cluster_analysis_cache = None
+        # LRU of optimize_portfolio results keyed by (sorted selection, risk, amount, epoch)
+        self._optimize_cache = OrderedDict()
+        # Separate from self._lock so cache hits are not held up by a fetch in progress
+        self._optimize_cache_lock = threading.Lock()
 
+    @property
+    def data(self):
+        """Close prices of the current snapshot"""
+        return self.market.data if self.market is not None else None
+    
+    @property
+    def returns(self):
+        """Daily returns of the current snapshot"""
+        return self.market.returns if self.market is not None else None
+    
     def fetch_market_data(self,period):
         ''' fetch historical market data for given stocks, and set self.data'''
         try:
-            
-            data = {}
-            # Fetch data for both S&P 500 and custom stocks
-            all_symbols = self.get_all_symbols()
-            for symbol in all_symbols:
-                try:
-                    ticker = yf.Ticker(symbol)
-                    hist = ticker.history(period=period)
-                    if len(hist) > 252:  # At least 1 year of data
-                        data[symbol] = hist['Close']
-                except Exception as e:
-                    print(f"Error fetching {symbol}: {e}")
-                    continue
-            
-            if len(data) < 20:
-                raise Exception("Not enough data fetched")
+            # Concurrent inits under a threaded server would otherwise download twice and interleave their writes
+            with self._lock:
+                all_symbols = self.get_all_symbols()
+                cache_path = self._price_cache_path(period, all_symbols)
+                # Past daily bars never change, so today's download can be reused across inits and restarts
+                data = self._read_price_cache(cache_path)
+                if data is None:
+                    # Fetch data for both S&P 500 and custom stocks in one batch; yfinance downloads
+                    # the tickers in parallel and leaves all-NaN columns for symbols that failed
+                    raw = yf.download(all_symbols, period=period, threads=True, progress=False,
+                                      group_by='ticker', auto_adjust=True)
+                    closes = raw.xs('Close', level=1, axis=1)
+
+                    data = closes.loc[:, closes.count() > 252]  # At least 1 year of data
+                    if len(data.columns) < 20:
+                        raise Exception("Not enough data fetched")
+
+                    data = data.ffill().dropna()
+                    self._write_price_cache(cache_path, data)
+
+                # Prices have no gaps after ffill().dropna(), so the first row is the only one without a return
+                returns = pd.DataFrame(_simple_returns(data.to_numpy(np.float64)),
+                                       index=data.index[1:], columns=data.columns)
                 
-            self.data = pd.DataFrame(data).fillna(method='ffill').dropna()
-            self.returns = self.data.pct_change().dropna()
-            print(f"Successfully fetched data for {len(self.data.columns)} stocks")
-            return True
+                # Build every derived structure first, then swap them in with one assignment
+                previous = self.market
+                self.market = MarketSnapshot(
+                    data=data,
+                    returns=returns,
+                    returns_mat=np.ascontiguousarray(returns.to_numpy(np.float32)),
+                    sym_idx={symbol: i for i, symbol in enumerate(returns.columns)},
+                    epoch=previous.epoch + 1 if previous is not None else 1
+                )
+                # Entries are keyed by epoch, so dropping the old ones is only about memory
+                self._moments_cache = {}
+                print(f"Successfully fetched data for {len(data.columns)} stocks")
+                return True
         except Exception as e:
             raise Exception(f"Error fetching market data {e}")
         
-    def calculate_metrics(self):
+    def _price_cache_path(self, period, symbols):
+        """Parquet file for today's history of this symbol set; adding a custom stock changes the key"""
+        symbols_hash = hashlib.sha1(','.join(sorted(symbols)).encode()).hexdigest()[:12]
+        return os.path.join(PRICE_CACHE_DIR, f"prices_{period}_{date.today().isoformat()}_{symbols_hash}.parquet")
+
+    def _read_price_cache(self, cache_path):
+        """Cached prices, or None when the file is missing or unreadable so the caller downloads instead"""
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            return pd.read_parquet(cache_path)
+        except Exception as e:
+            print(f"Ignoring unreadable price cache {cache_path}: {e}")
+            return None
+
+    def _write_price_cache(self, cache_path, data):
+        """Write today's prices and drop files from earlier days"""
+        # Written under a temporary name and renamed, so another process never reads a partial file
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(PRICE_CACHE_DIR, exist_ok=True)
+            data.to_parquet(tmp_path)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            print(f"Error writing price cache {cache_path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        today = f"_{date.today().isoformat()}_"
+        for name in os.listdir(PRICE_CACHE_DIR):
+            if name.startswith('prices_') and today not in name:
+                try:
+                    os.remove(os.path.join(PRICE_CACHE_DIR, name))
+                except OSError as e:
+                    print(f"Error pruning price cache {name}: {e}")
+
+    def calculate_metrics(self, returns=None):
         """Calculate key financial metrics for each stock"""
-        if self.returns is None:
+        if returns is None:
+            returns = self.returns
+        if returns is None:
             return None
             
-        metrics = {}
-        for symbol in self.returns.columns:
-            returns = self.returns[symbol]
-            
-            metrics[symbol] = {
-                'annual_return': returns.mean() * 252,
-                'volatility': returns.std() * np.sqrt(252),
-                'sharpe_ratio': (returns.mean() * 252) / (returns.std() * np.sqrt(252)),
-                'max_drawdown': self.calculate_max_drawdown(symbol),
-                'correlation_with_market': returns.corr(self.returns.mean(axis=1))
-            }
-        
-        return pd.DataFrame(metrics).T
-    
-    def calculate_max_drawdown(self, symbol):
-        #calculate drawdown for a given stock using drawdown formula
-        prices = self.data[symbol]
-        cumulative = (1 + self.returns[symbol]).cumprod() #cumulative product dataset
-        running_max = cumulative.expanding().max() 
-        drawdown = (cumulative - running_max) / running_max
-        return drawdown.min()
+        # Whole-frame reductions: one pass per metric over every symbol instead of a loop per column
+        annual_return = returns.mean() * 252
+        volatility = returns.std() * np.sqrt(252)
+        market = returns.mean(axis=1)
+        # Growth of $1 per symbol, materialized once; max drawdown is its worst dip below the running peak
+        cumulative = (1 + returns).cumprod()
+
+        return pd.DataFrame({
+            'annual_return': annual_return,
+            'volatility': volatility,
+            'sharpe_ratio': annual_return / volatility,
+            'max_drawdown': (cumulative / cumulative.cummax() - 1).min(),
+            'correlation_with_market': returns.corrwith(market)
+        })
     
     def perform_clustering(self, n_clusters=6):
         '''USE scikit to cluster stocks based on metrics'''
-        metrics_df = self.calculate_metrics()
-        if metrics_df is None:
+        market = self.market
+        if market is None:
             return None
+        metrics_df = self.calculate_metrics(market.returns)
         
         # Select features 
         features = ['annual_return', 'volatility', 'sharpe_ratio']
@@ -98,25 +323,38 @@ class StockAdvisor:
         scaler = StandardScaler()
         X_scaled = scaler.fit_transform(X)
         
-        #K-means clustering
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+        #K-means clustering; restarts are kept because a single seeded run often lands in a worse
+        # partition, and elkan's triangle-inequality bounds skip most distance checks in each of them
+        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10, init='k-means++', algorithm='elkan')
         clusters = kmeans.fit_predict(X_scaled)
         
         metrics_df['cluster'] = clusters
         self.clusters = metrics_df
         
+        # One grouped aggregation for every cluster's summary stats instead of slicing per cluster
+        grouped = metrics_df.groupby('cluster')
+        summary = grouped.agg(
+            avg_return=('annual_return', 'mean'),
+            avg_volatility=('volatility', 'mean'),
+            avg_sharpe=('sharpe_ratio', 'mean'),
+            size=('volatility', 'size')
+        )
+        stocks_by_cluster = grouped.groups  # cluster id -> index of its stocks
+        
+        # Cluster ids come back as numpy ints; _json_response handles numpy values, but neither orjson's
+        # OPT_NON_STR_KEYS nor the json.dumps fallback accepts them as dict keys
         cluster_analysis = {}
-        for cluster_id in range(n_clusters):
-            cluster_stocks = metrics_df[metrics_df['cluster'] == cluster_id] #values where cluster id matches up
-            cluster_analysis[cluster_id] = {
-                'stocks': cluster_stocks.index.tolist(), #list of stocks in that cluster
-                'avg_return': cluster_stocks['annual_return'].mean(),
-                'avg_volatility': cluster_stocks['volatility'].mean(),
-                'avg_sharpe': cluster_stocks['sharpe_ratio'].mean(),
-                'size': len(cluster_stocks),
-                'risk_level': self.categorize_risk_level(cluster_stocks['volatility'].mean())
+        for cluster_id, row in zip(summary.index, summary.itertuples(index=False)):
+            cluster_analysis[int(cluster_id)] = {
+                'stocks': stocks_by_cluster[cluster_id].tolist(), #list of stocks in that cluster
+                'avg_return': row.avg_return,
+                'avg_volatility': row.avg_volatility,
+                'avg_sharpe': row.avg_sharpe,
+                'size': row.size,
+                'risk_level': self.categorize_risk_level(row.avg_volatility)
             }
         
+        self._cluster_analysis_cache = (market.epoch, cluster_analysis)
         return cluster_analysis
     
     def categorize_risk_level(self, volatility):
@@ -128,18 +366,35 @@ class StockAdvisor:
         else:
             return 'High'
     
-    def optimize_portfolio(self, selected_stocks, risk_tolerance='balanced', investment_amount=10000):
+    def optimize_portfolio(self, selected_stocks, risk_tolerance='balanced', investment_amount=10000, market=None):
         """Optimize portfolio using Modern Portfolio Theory with capital-aware constraints"""
         """returns optimal weights, expected return, optimal sharpe ratio etc"""
         if not selected_stocks or len(selected_stocks) < 2:
             return None
-            
-        # Filter returns for selected stocks
-        stock_returns = self.returns[selected_stocks].fillna(0)
-        
-        # Calculate expected returns and covariance matrix
-        expected_returns = stock_returns.mean() * 252
-        cov_matrix = stock_returns.cov() * 252
+        if market is None:
+            market = self.market
+        
+        # Identical requests (the frontend re-asks on every UI interaction) skip the solver entirely
+        cache_key = (tuple(sorted(selected_stocks)), risk_tolerance, investment_amount, market.epoch)
+        with self._optimize_cache_lock:
+            cached = self._optimize_cache.get(cache_key)
+            if cached is not None:
+                self._optimize_cache.move_to_end(cache_key)
+                return cached
+        # Solve outside the lock; two threads racing on the same key just store equal results
+        result = self._optimize_portfolio(selected_stocks, risk_tolerance, investment_amount, market)
+        if result is not None:
+            with self._optimize_cache_lock:
+                self._optimize_cache[cache_key] = result
+                while len(self._optimize_cache) > OPTIMIZE_CACHE_SIZE:
+                    self._optimize_cache.popitem(last=False)
+        return result
+    
+    def _optimize_portfolio(self, selected_stocks, risk_tolerance, investment_amount, market):
+        """Uncached body of optimize_portfolio, computed entirely from one snapshot"""
+        # Annualized expected returns and covariance matrix as plain arrays, so the objective
+        # evaluations inside SLSQP never go through pandas
+        expected_returns, cov_matrix = self._annualized_moments(selected_stocks, market)
         
         # Adjust risk multiplier based on type of risk pursuit
         risk_multiplier = {'conservative': 0.5, 'balanced': 1.0, 'aggressive': 1.5}
@@ -150,51 +405,55 @@ class StockAdvisor:
         transaction_costs = self.calculate_transaction_costs(selected_stocks, investment_amount)
         
         # Calculate minimum viable weights based on investment amount
-        min_weights = self.calculate_minimum_weights(selected_stocks, investment_amount)
+        min_weights = self.calculate_minimum_weights(selected_stocks, investment_amount, market.data)
+        
+        net_expected_returns = expected_returns - transaction_costs
         
         def objective(weights): # error function of sharpe ratio given model weights
-            portfolio_return = np.sum(weights * expected_returns)
-            portfolio_variance = np.dot(weights.T, np.dot(cov_matrix, weights))
-            sharpe_ratio = portfolio_return / np.sqrt(portfolio_variance)
-            
-            # Adjust for transaction costs (net return consideration)
-            # This allows for minimization of sharpe ration in more realistic sense
-            net_return = portfolio_return - np.sum(weights * transaction_costs)
+            # Net (after transaction costs) Sharpe ratio; this allows for minimization of sharpe ration in more realistic sense
+            net_sharpe = _net_sharpe(weights, net_expected_returns, cov_matrix)
             
             # Penalize portfolios with too many small positions (diversification cost)
             diversification_penalty = self.calculate_diversification_penalty(weights, investment_amount)
             
             # Final objective: maximize risk-adjusted net return
-            adjusted_sharpe = net_return / np.sqrt(portfolio_variance) - diversification_penalty
+            adjusted_sharpe = net_sharpe - diversification_penalty
             return -adjusted_sharpe * risk_factor
         
+        def objective_gradient(weights):
+            # The position-count penalty is a step function, so it contributes nothing between steps
+            return -_net_sharpe_grad(weights, net_expected_returns, cov_matrix) * risk_factor
+        
         # Dynamic bounds based on investment amount
-        bounds = self._calculate_dynamic_bounds(selected_stocks, investment_amount, min_weights)
+        bounds = self.calculate_dynamic_bounds(selected_stocks, investment_amount, min_weights)
         
         # constraint function (tuple because that's what minimize function takes)
-        constraints = {'type': 'eq', 'func': lambda x: np.sum(x) - 1}
-        
-        initial_guess = np.array([1/len(selected_stocks)] * len(selected_stocks))
+        constraints = {'type': 'eq', 'fun': lambda x: np.sum(x) - 1}
         
         # Optimize
         try:
-            result = minimize(objective, initial_guess, method='SLSQP',
-                            bounds=bounds, constraints=constraints)
-            #minimize function using sequential least squares programming
-            # result after optimization would contain the ideal weights in the shape of initial guess
-            # Enhanced with capital-aware optimization
+            # Max-Sharpe as a convex QP finds the global optimum; SLSQP is only the fallback when cvxpy
+            # is missing or the QP is infeasible
+            optimal_weights = self._solve_max_sharpe_qp(net_expected_returns, cov_matrix, bounds)
+            if optimal_weights is None:
+                initial_guess = np.array([1/len(selected_stocks)] * len(selected_stocks))
+                # Analytic gradient saves SLSQP the N+1 objective calls of a finite-difference estimate
+                result = minimize(objective, initial_guess, method='SLSQP', jac=objective_gradient,
+                                bounds=bounds, constraints=constraints)
+                #minimize function using sequential least squares programming
+                # result after optimization would contain the ideal weights in the shape of initial guess
+                # Enhanced with capital-aware optimization
+                optimal_weights = result.x if result.success else None
             
-            if result.success:
-                optimal_weights = result.x
-                
+            if optimal_weights is not None:
                 # Calculate portfolio metrics
-                portfolio_return = np.sum(optimal_weights * expected_returns)
-                portfolio_variance = np.dot(optimal_weights.T, np.dot(cov_matrix, optimal_weights))
+                portfolio_return = optimal_weights @ expected_returns
+                portfolio_variance = optimal_weights @ cov_matrix @ optimal_weights
                 portfolio_volatility = np.sqrt(portfolio_variance)
                 sharpe_ratio = portfolio_return / portfolio_volatility
                 
                 # Calculate net return after transaction costs
-                net_return = portfolio_return - np.sum(optimal_weights * transaction_costs)
+                net_return = portfolio_return - optimal_weights @ transaction_costs
                 net_sharpe = net_return / portfolio_volatility if portfolio_volatility > 0 else 0
                 
                 return {
@@ -212,6 +471,51 @@ class StockAdvisor:
         
         return None
     
+    def _solve_max_sharpe_qp(self, net_expected_returns, cov_matrix, bounds):
+        """Maximize net Sharpe ratio under the weight bounds as a convex QP; returns weights or None
+        
+        Uses the y = w * k substitution: minimize y' cov y subject to net_return(y) = 1, sum(y) = k
+        and lower * k <= y <= upper * k, then w = y / k. Needs at least one asset with a positive
+        net expected return, otherwise the problem is infeasible and None is returned.
+        """
+        if cp is None or not np.any(net_expected_returns > 0):
+            return None
+        lower = np.array([b[0] for b in bounds])
+        upper = np.array([b[1] for b in bounds])
+        
+        y = cp.Variable(len(net_expected_returns), nonneg=True)
+        kappa = cp.Variable(nonneg=True)
+        problem = cp.Problem(cp.Minimize(cp.quad_form(y, cp.psd_wrap(cov_matrix))), [
+            net_expected_returns @ y == 1,
+            cp.sum(y) == kappa,
+            y >= lower * kappa,
+            y <= upper * kappa
+        ])
+        try:
+            problem.solve()
+        except cp.error.SolverError as e:
+            print(f"QP solver error: {e}")
+            return None
+        if problem.status not in (cp.OPTIMAL, cp.OPTIMAL_INACCURATE) or not kappa.value:
+            return None
+        weights = y.value / kappa.value
+        return weights / weights.sum()
+    
+    def _annualized_moments(self, selected_stocks, market):
+        """Annualized expected returns and covariance of the selection, cached per snapshot"""
+        key = (market.epoch, tuple(selected_stocks))
+        cache = self._moments_cache
+        moments = cache.get(key)
+        if moments is None:
+            idx = np.fromiter((market.sym_idx[s] for s in selected_stocks), dtype=np.intp, count=len(selected_stocks))
+            stock_returns = market.returns_mat[:, idx]
+            # mean() stays in float32 for float32 input, but np.cov upcasts to float64 unless told
+            # otherwise; both results are widened afterwards because the solvers work in double precision
+            moments = ((stock_returns.mean(axis=0) * 252).astype(np.float64),
+                       (np.cov(stock_returns, rowvar=False, dtype=np.float32) * 252).astype(np.float64))
+            cache[key] = moments
+        return moments
+    
     def calculate_transaction_costs(self, selected_stocks, investment_amount):
         """Calculate transaction costs for each stock based on investment amount"""
       
@@ -229,18 +533,14 @@ class StockAdvisor:
         # Return array of costs for each stock
         return np.full(len(selected_stocks), total_cost_rate)
     
-    def calculate_minimum_weights(self, selected_stocks, investment_amount):
+    def calculate_minimum_weights(self, selected_stocks, investment_amount, data=None):
         """Calculate minimum viable weights based on investment amount and stock prices for the lower_bounds"""
-        min_weights = []
-        
-        for stock in selected_stocks:
-            current_price = self.data[stock].iloc[-1]
-            # Minimum investment per stock: enough to buy at least 1 share + transaction costs
-            min_investment = current_price + 10  # $10 buffer for transaction costs
-            min_weight = min_investment / investment_amount
-            min_weights.append(min_weight)
-        
-        return np.array(min_weights)
+        if data is None:
+            data = self.data
+        current_prices = data[selected_stocks].iloc[-1].to_numpy(np.float64)
+        # Minimum investment per stock: enough to buy at least 1 share + transaction costs
+        min_investment = current_prices + 10  # $10 buffer for transaction costs
+        return min_investment / investment_amount
     
     def calculate_diversification_penalty(self, weights, investment_amount):
         """Penalize portfolios with too many small positions for smaller investments"""
@@ -285,32 +585,52 @@ class StockAdvisor:
         if not isinstance(stock_symbols, list):
             stock_symbols = [stock_symbols]
         
+        symbols = [symbol.upper().strip() for symbol in stock_symbols]
+        
+        # Validation is one network round trip per new symbol, so run those concurrently
+        candidates = list(dict.fromkeys(
+            symbol for symbol in symbols
+            if symbol not in self.sp500_symbols and symbol not in self.custom_symbols
+        ))
+        validation = {}
+        if candidates:
+            with ThreadPoolExecutor(max_workers=min(VALIDATION_WORKERS, len(candidates))) as pool:
+                validation = dict(zip(candidates, pool.map(self._validate_symbol, candidates)))
+        
         added_stocks = []
         failed_stocks = []
         
-        for symbol in stock_symbols:
-            symbol = symbol.upper().strip()
-            if symbol not in self.sp500_symbols and symbol not in self.custom_symbols:
-                # Test if the stock symbol is valid by trying to fetch a small amount of data
-                try:
-                    ticker = yf.Ticker(symbol)
-                    # Try to get just 5 days of data to validate the symbol
-                    test_data = ticker.history(period="5d")
-                    if len(test_data) > 0:
+        with self._lock:
+            for symbol in symbols:
+                # Re-check membership: another request may have added the symbol while this one validated it
+                if symbol in validation and symbol not in added_stocks and symbol not in self.custom_symbols:
+                    error = validation[symbol]
+                    if error is None:
                         self.custom_symbols.append(symbol)
                         added_stocks.append(symbol)
                     else:
-                        failed_stocks.append(f"{symbol} (no data available)")
-                except Exception as e:
-                    failed_stocks.append(f"{symbol} (invalid symbol)")
-            else:
-                failed_stocks.append(f"{symbol} (already exists)")
-        
-        return {
-            'added': added_stocks,
-            'failed': failed_stocks,
-            'total_custom_stocks': len(self.custom_symbols)
-        }
+                        failed_stocks.append(f"{symbol} ({error})")
+                else:
+                    failed_stocks.append(f"{symbol} (already exists)")
+            
+            return {
+                'added': added_stocks,
+                'failed': failed_stocks,
+                'total_custom_stocks': len(self.custom_symbols)
+            }
+    
+    def _validate_symbol(self, symbol):
+        """Check a symbol has recent data; returns None if valid, else the reason it was rejected"""
+        # Test if the stock symbol is valid by trying to fetch a small amount of data
+        try:
+            ticker = _ticker(symbol)
+            # Try to get just 5 days of data to validate the symbol
+            test_data = ticker.history(period="5d")
+            if len(test_data) > 0:
+                return None
+            return "no data available"
+        except Exception as e:
+            return "invalid symbol"
     
     def remove_custom_stocks(self, stock_symbols):
         """Remove custom stocks from the portfolio"""
@@ -320,19 +640,20 @@ class StockAdvisor:
         removed_stocks = []
         not_found_stocks = []
         
-        for symbol in stock_symbols:
-            symbol = symbol.upper().strip()
-            if symbol in self.custom_symbols:
-                self.custom_symbols.remove(symbol)
-                removed_stocks.append(symbol)
-            else:
-                not_found_stocks.append(symbol)
-        
-        return {
-            'removed': removed_stocks,
-            'not_found': not_found_stocks,
-            'total_custom_stocks': len(self.custom_symbols)
-        }
+        with self._lock:
+            for symbol in stock_symbols:
+                symbol = symbol.upper().strip()
+                if symbol in self.custom_symbols:
+                    self.custom_symbols.remove(symbol)
+                    removed_stocks.append(symbol)
+                else:
+                    not_found_stocks.append(symbol)
+            
+            return {
+                'removed': removed_stocks,
+                'not_found': not_found_stocks,
+                'total_custom_stocks': len(self.custom_symbols)
+            }
     
     def get_all_symbols(self):
         """Get all available stock symbols (S&P 500 + custom)"""
@@ -344,56 +665,54 @@ class StockAdvisor:
     
     def clear_custom_stocks(self):
         """Clear all custom stocks"""
-        removed_count = len(self.custom_symbols)
-        self.custom_symbols = []
+        with self._lock:
+            removed_count = len(self.custom_symbols)
+            self.custom_symbols = []
         return removed_count
     
-    def backtest_portfolio(self, weights, start_date=None, end_date=None):
+    def backtest_portfolio(self, weights, start_date=None, end_date=None, data=None):
         """Backtest the portfolio performance"""
         if weights is None:
             return None
         
-        # Convert weights dict to series
-        weight_series = pd.Series(weights)
         selected_stocks = list(weights.keys())
+        weight_vector = np.fromiter(weights.values(), dtype=np.float64, count=len(selected_stocks))
         
         # Filter data for backtesting period
-        backtest_data = self.data[selected_stocks]
+        backtest_data = (data if data is not None else self.data)[selected_stocks]
         if start_date:
             backtest_data = backtest_data[backtest_data.index >= start_date]
         if end_date:
             backtest_data = backtest_data[backtest_data.index <= end_date]
         
-        # Calculate portfolio value over time
-        backtest_returns = backtest_data.pct_change().dropna()
-        portfolio_returns = backtest_returns.dot(weight_series)
-        cumulative_returns = (1 + portfolio_returns).cumprod()
+        # Calculate portfolio value over time on the raw price matrix: one matrix-vector product for
+        # the portfolio and one row mean for the benchmark, with no intermediate frames
+        backtest_returns = _simple_returns(backtest_data.to_numpy(np.float64))
+        dates = backtest_data.index[1:]
+        portfolio_returns = backtest_returns @ weight_vector
+        # Cumulative value and max drawdown come out of one fused loop instead of three pandas passes
+        cumulative_returns, max_drawdown = _cum_dd(portfolio_returns)
         
         # Benchmark (S&P 500 approximation)
-        benchmark_returns = backtest_returns.mean(axis=1)
-        benchmark_cumulative = (1 + benchmark_returns).cumprod()
+        benchmark_cumulative = np.cumprod(1 + backtest_returns.mean(axis=1))
         
         # Calculate metrics
-        total_return = cumulative_returns.iloc[-1] - 1
+        total_return = cumulative_returns[-1] - 1
         annual_return = (1 + total_return) ** (252 / len(portfolio_returns)) - 1
-        volatility = portfolio_returns.std() * np.sqrt(252)
+        volatility = portfolio_returns.std(ddof=1) * np.sqrt(252)
         sharpe_ratio = annual_return / volatility if volatility > 0 else 0
         
-        # Maximum drawdown
-        running_max = cumulative_returns.expanding().max()
-        drawdown = (cumulative_returns - running_max) / running_max
-        max_drawdown = drawdown.min()
-        
         return {
             'total_return': total_return,
             'annual_return': annual_return,
             'volatility': volatility,
             'sharpe_ratio': sharpe_ratio,
             'max_drawdown': max_drawdown,
-            'cumulative_returns': cumulative_returns.tolist(),
-            'dates': cumulative_returns.index.strftime('%Y-%m-%d').tolist(),
-            'benchmark_returns': benchmark_cumulative.tolist(),
-            'portfolio_returns': portfolio_returns.tolist()
+            # Arrays go out as-is and are serialized in C by _json_response
+            'cumulative_returns': cumulative_returns,
+            'dates': np.datetime_as_string(dates.values.astype('datetime64[D]'), unit='D').tolist(),
+            'benchmark_returns': benchmark_cumulative,
+            'portfolio_returns': portfolio_returns
         }
     
 advisor=StockAdvisor()
@@ -409,7 +728,7 @@ def init_process():
         success = advisor.fetch_market_data(period="2y")
         if success:
             cluster_analysis = advisor.perform_clustering()
-            return jsonify({
+            return _json_response({
                 'success': True,
                 'message': 'Data initialized successfully',
                 'clusters': cluster_analysis,
@@ -426,8 +745,13 @@ def get_clusters():
     if advisor.clusters is None:
         return jsonify({'success': False, 'message': 'Data not initialized'}), 400
     
-    cluster_analysis = advisor.perform_clustering()
-    return jsonify({'success': True, 'clusters': cluster_analysis})
+    # Clusters only change when market data is refetched, so reuse the analysis from init
+    cached = advisor._cluster_analysis_cache
+    if cached is not None and cached[0] == advisor.market.epoch:
+        cluster_analysis = cached[1]
+    else:
+        cluster_analysis = advisor.perform_clustering()
+    return _json_response({'success': True, 'clusters': cluster_analysis})
 
 @app.route("/api/stocks/add", methods=["POST"])
 def add_custom_stocks():
@@ -563,25 +887,28 @@ def recommend_stock():
             selected_stocks = advisor.clusters.nlargest(10, 'sharpe_ratio').index.tolist()
         
         # Use sharpe ratio minimization to optimize portfolio weights with capital consideration
-        optimized_portfolio = advisor.optimize_portfolio(selected_stocks, risk_tolerance, investment_amount)
+        # One snapshot for the whole request, so optimization, share counts and backtest agree
+        market = advisor.market
+        optimized_portfolio = advisor.optimize_portfolio(selected_stocks, risk_tolerance, investment_amount, market)
         
         if optimized_portfolio is None:
             return jsonify({'success': False, 'message': 'Portfolio optimization failed'}), 500
         
-        # Calculate dollar allocations
+        # Calculate dollar allocations; latest prices are read from the frame once, not per stock
+        last_prices = market.data.iloc[-1]
         dollar_weights = {}
         for stock, weight in optimized_portfolio['weights'].items():
             if weight > 0.01:  # Only include weights > 1%
                 dollar_weights[stock] = {
                     'weight': weight,
                     'dollar_amount': weight * investment_amount,
-                    'shares': int((weight * investment_amount) / advisor.data[stock].iloc[-1])
+                    'shares': int((weight * investment_amount) / last_prices[stock])
                 }
         
         # Backtest the portfolio
-        backtest_results = advisor.backtest_portfolio(optimized_portfolio['weights'])
+        backtest_results = advisor.backtest_portfolio(optimized_portfolio['weights'], data=market.data)
         
-        return jsonify({
+        return _json_response({
             'success': True,
             'portfolio': {
                 'allocations': dollar_weights,
@@ -601,5 +928,9 @@ def recommend_stock():
         return jsonify({'success': False, 'message': 'Invalid input data'}), 400
 
 
+# Development server only. For deployment run a WSGI server from the backend directory, e.g.
+#   gunicorn -w 1 -k gthread --threads 8 -b 0.0.0.0:5000 app:app
+# Keep a single worker process: market data, clusters and custom stocks live in this process's
+# advisor, so extra workers would each need their own /api/init and never see each other's stocks.
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', host='0.0.0.0', port=5000)